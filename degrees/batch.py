@@ -0,0 +1,105 @@
+import contextlib
+import csv
+import functools
+import json
+import multiprocessing
+import os
+import sys
+
+import degrees
+
+# Optional command-line flags accepted by main, besides --workers=N
+FLAGS = ["--compact", "--bidirectional"]
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    workers = os.cpu_count()
+    for flag in flags:
+        if flag.startswith("--workers="):
+            workers = int(flag[len("--workers="):])
+        elif flag not in FLAGS:
+            sys.exit(
+                "Usage: python batch.py [directory] [pairs.csv] "
+                "[--workers=N] [--compact] [--bidirectional]"
+            )
+    if len(args) > 2:
+        sys.exit("Usage: python batch.py [directory] [pairs.csv]")
+    directory = args[0] if args else "large"
+    filename = args[1] if len(args) == 2 else "-"
+
+    # Load the graph once; forked workers share it copy-on-write
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory, compact="--compact" in flags)
+    print("Data loaded.", file=sys.stderr)
+
+    solve = functools.partial(
+        solve_pair, bidirectional="--bidirectional" in flags
+    )
+    with open_pairs(filename) as f, contextlib.ExitStack() as stack:
+        pairs = read_pairs(f)
+        if workers > 1:
+            context = multiprocessing.get_context("fork")
+            pool = stack.enter_context(context.Pool(workers))
+            results = pool.imap(solve, pairs, chunksize=16)
+        else:
+            results = map(solve, pairs)
+        for result in results:
+            print(json.dumps(result), flush=True)
+
+
+def open_pairs(filename):
+    """
+    Returns the pairs file to read, or stdin if `filename` is "-".
+    """
+    if filename == "-":
+        return contextlib.nullcontext(sys.stdin)
+    return open(filename, encoding="utf-8", newline="")
+
+
+def read_pairs(f):
+    """
+    Yield (source, target) pairs from a CSV file with two columns,
+    each holding either an IMDB person id or a person's name.
+    Blank lines are skipped.
+    """
+    for row in csv.reader(f):
+        if not row:
+            continue
+        if len(row) != 2:
+            yield (",".join(row), None)
+            continue
+        yield (row[0].strip(), row[1].strip())
+
+
+def solve_pair(pair, bidirectional=False):
+    """
+    Returns a JSON-serializable result for one (source, target) pair.
+    """
+    source, target = pair
+    result = {"source": source, "target": target}
+    if target is None:
+        result["error"] = "expected a source and a target"
+        return result
+    try:
+        source_id = degrees.resolve_person(source)
+        target_id = degrees.resolve_person(target)
+    except ValueError as e:
+        result["error"] = str(e)
+        return result
+
+    path = degrees.shortest_path(source_id, target_id, bidirectional=bidirectional)
+    result["source_id"] = source_id
+    result["target_id"] = target_id
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [list(step) for step in path]
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import time
+from bisect import bisect
+from itertools import accumulate
+
+import degrees
+
+# Default dataset sizes, in star credits
+SIZES = [10_000, 100_000, 1_000_000]
+
+# Number of queries timed per workload
+QUERIES = 20
+
+# Number of people whose neighbors are timed
+NEIGHBOR_SAMPLES = 1000
+
+# Fraction of people set apart in small casts of their own, so that
+# some pairs of people are never connected
+ISLAND_FRACTION = 0.01
+
+# Fraction of people, movies and credits held back as a delta, to time
+# applying it to the rest of the dataset
+DELTA_FRACTION = 0.1
+
+# Ratio above which a workload is reported as a regression by --compare
+REGRESSION = 1.2
+
+SYLLABLES = [
+    "ka", "lo", "mi", "ra", "ne", "to", "sa", "vi", "del", "mar",
+    "an", "el", "or", "is", "ben", "jo", "li", "ta", "ro", "ste"
+]
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    flags = dict(
+        arg[2:].split("=", 1) for arg in sys.argv[1:]
+        if arg.startswith("--") and "=" in arg
+    )
+    if any(flag not in ("output", "seed", "compare") for flag in flags):
+        sys.exit(
+            "Usage: python benchmark.py [credits ...] "
+            "[--output=results.jsonl] [--seed=N] [--compare=baseline.jsonl]"
+        )
+    sizes = [int(arg) for arg in args] or SIZES
+    seed = int(flags.get("seed", 0))
+    output = flags.get("output", "benchmark.jsonl")
+
+    results = []
+    for credits in sizes:
+        directory = f"bench/{credits}-{seed}"
+        if not os.path.exists(f"{degrees.folder}/{directory}/stars.csv"):
+            print(f"Generating {credits} credits...")
+            generate(f"{degrees.folder}/{directory}", credits, seed)
+        if not os.path.exists(f"{degrees.folder}/{directory}/delta/stars.csv"):
+            split(f"{degrees.folder}/{directory}", seed)
+        for result in run(directory, credits, seed):
+            print(
+                f"{credits:>10} {result['mode']:<20} {result['workload']:<12} "
+                f"{result['seconds']:10.4f}s ({result['count']} ops)"
+            )
+            results.append(result)
+
+    with open(output, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+    if "compare" in flags:
+        compare(flags["compare"], results)
+
+
+def generate(path, credits, seed):
+    """
+    Write people.csv, movies.csv and stars.csv with about `credits` star
+    credits to `path`. Cast sizes follow a power law, popular people are
+    cast far more often than others, and a few people only appear in
+    small casts of their own. The same seed always gives the same files.
+    """
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+
+    # About three credits per person and per movie
+    people_count = max(10, credits // 3)
+    mainland = mainland_size(people_count)
+    islanders = people_count - mainland
+
+    with open(f"{path}/people.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(people_count):
+            writer.writerow([i, person_name(rng), rng.randint(1900, 2010)])
+
+    # Popularity of the i-th mainland person falls off as a power law
+    weights = list(accumulate(1 / (i + 1) ** 0.8 for i in range(mainland)))
+
+    movies = []
+    total = 0
+    while total < credits - islanders:
+        size = min(int(rng.paretovariate(1.5)), 200)
+        cast = {
+            bisect(weights, rng.random() * weights[-1])
+            for _ in range(size)
+        }
+        movies.append(cast)
+        total += len(cast)
+
+    # Islanders star only with each other, in groups of up to four
+    for start in range(mainland, people_count, 4):
+        movies.append(set(range(start, min(start + 4, people_count))))
+
+    with open(f"{path}/movies.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(len(movies)):
+            writer.writerow([i, f"Movie {i}", rng.randint(1920, 2020)])
+
+    with open(f"{path}/stars.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for i, cast in enumerate(movies):
+            for person in sorted(cast):
+                writer.writerow([person, i])
+
+
+def split(path, seed):
+    """
+    Write the dataset in `path` again as a base dataset in `path`/base and
+    a delta in `path`/delta, with DELTA_FRACTION of the people, movies and
+    credits picked at random held back in the delta. Credits of held back
+    people or movies are held back too.
+    """
+    rng = random.Random(seed)
+    held = {}
+    for name in ("people", "movies", "stars"):
+        with open(f"{path}/{name}.csv", encoding="utf-8", newline="") as f:
+            header, *rows = list(csv.reader(f))
+        late = set(rng.sample(range(len(rows)), int(len(rows) * DELTA_FRACTION)))
+        if name == "stars":
+            late.update(
+                i for i, (person_id, movie_id) in enumerate(rows)
+                if person_id in held["people"] or movie_id in held["movies"]
+            )
+        else:
+            held[name] = {rows[i][0] for i in late}
+
+        for part in ("base", "delta"):
+            os.makedirs(f"{path}/{part}", exist_ok=True)
+            with open(f"{path}/{part}/{name}.csv", "w", encoding="utf-8",
+                      newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(
+                    row for i, row in enumerate(rows)
+                    if (i in late) == (part == "delta")
+                )
+
+
+def mainland_size(people_count):
+    """
+    Returns how many of `people_count` generated people are not islanders.
+    Islanders have the highest ids.
+    """
+    return people_count - max(2, int(people_count * ISLAND_FRACTION))
+
+
+def person_name(rng):
+    """
+    Returns a random two-part name.
+    """
+    parts = []
+    for _ in range(2):
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+        parts.append(word.capitalize())
+    return " ".join(parts)
+
+
+def reset():
+    """
+    Clear everything loaded by degrees.load_data.
+    """
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+    degrees.graph = None
+
+
+def run(directory, credits, seed):
+    """
+    Time loading, neighbor generation and each query workload on the
+    dataset in `directory`, for each loader and search mode. Returns a
+    list of result records.
+    """
+    results = []
+
+    def record(mode, workload, count, seconds):
+        results.append({
+            "suite": "degrees",
+            "credits": credits,
+            "seed": seed,
+            "mode": mode,
+            "workload": workload,
+            "count": count,
+            "seconds": seconds,
+            "python": platform.python_version(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+        })
+
+    # Pick people and query pairs once, so every mode answers the same queries
+    reset()
+    degrees.load_data(directory, snapshot=False)
+    workloads = query_pairs(seed)
+    candidates = sorted(ids_with_movies())
+    sample = random.Random(seed).sample(
+        candidates, min(NEIGHBOR_SAMPLES, len(candidates))
+    )
+
+    for compact in (False, True):
+        loader = "compact" if compact else "dict"
+
+        reset()
+        start = time.perf_counter()
+        degrees.load_data(directory, compact=compact, snapshot=False)
+        record(loader, "load_csv", 1, time.perf_counter() - start)
+
+        # The first snapshot load writes it, the second only reads it
+        reset()
+        degrees.load_data(directory, compact=compact)
+        reset()
+        start = time.perf_counter()
+        degrees.load_data(directory, compact=compact)
+        record(loader, "load_snapshot", 1, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for person_id in sample:
+            degrees.neighbors_for_person(person_id)
+        record(loader, "neighbors", len(sample), time.perf_counter() - start)
+
+        # Applying the delta to the base must give the same components as
+        # loading the full dataset
+        degrees.build_components()
+        expected = sorted(degrees.component_sizes())
+        reset()
+        degrees.load_data(
+            f"{directory}/base", compact=compact, snapshot=False,
+            components=True
+        )
+        start = time.perf_counter()
+        added = degrees.apply_delta(f"{directory}/delta")
+        record(loader, "apply_delta", added["stars"], time.perf_counter() - start)
+        if sorted(degrees.component_sizes()) != expected:
+            sys.exit(f"Components differ after applying delta with {loader} loader")
+        reset()
+        degrees.load_data(directory, compact=compact)
+
+        for bidirectional in (False, True):
+            mode = f"{loader}-{'bidirectional' if bidirectional else 'bfs'}"
+            for workload, pairs in workloads.items():
+                start = time.perf_counter()
+                for source, target in pairs:
+                    degrees.shortest_path(
+                        source, target, bidirectional=bidirectional
+                    )
+                record(mode, workload, len(pairs), time.perf_counter() - start)
+
+    reset()
+    return results
+
+
+def ids_with_movies():
+    """
+    Returns the ids of people who starred in at least one movie.
+    """
+    return [
+        person_id for person_id, person in degrees.people.items()
+        if person["movies"]
+    ]
+
+
+def query_pairs(seed):
+    """
+    Returns near, far and unreachable (source, target) pairs of
+    person_ids from the data loaded with the dict loader.
+    """
+    rng = random.Random(seed)
+    people = sorted(ids_with_movies(), key=int)
+    boundary = mainland_size(len(degrees.people))
+    mainland = [p for p in people if int(p) < boundary]
+    islanders = [p for p in people if int(p) >= boundary]
+
+    # Targets are two co-star steps from the source, never the source itself
+    near = []
+    while len(near) < QUERIES:
+        source = rng.choice(mainland)
+        target = source
+        for _ in range(2):
+            co_stars = sorted(
+                person_id
+                for _, person_id in degrees.neighbors_for_person(target)
+                if person_id not in (source, target)
+            )
+            if not co_stars:
+                break
+            target = rng.choice(co_stars)
+        if target != source:
+            near.append((source, target))
+
+    far = []
+    while len(far) < QUERIES:
+        source = rng.choice(mainland)
+        distances = degrees.distances_from(source)
+        farthest = max(distances.values())
+        candidates = sorted(p for p, d in distances.items() if d == farthest)
+        far.append((source, rng.choice(candidates)))
+
+    unreachable = [
+        (rng.choice(mainland), rng.choice(islanders)) for _ in range(QUERIES)
+    ]
+
+    return {"near": near, "far": far, "unreachable": unreachable}
+
+
+def compare(filename, results):
+    """
+    Print the ratio of each result to the latest matching result in a
+    previous results file, flagging regressions.
+    """
+    baseline = {}
+    with open(filename) as f:
+        for line in f:
+            result = json.loads(line)
+            if result.get("suite") != "degrees":
+                continue
+            key = (result["credits"], result["seed"], result["mode"], result["workload"])
+            baseline[key] = result["seconds"]
+
+    print("Comparison with", filename)
+    for result in results:
+        key = (result["credits"], result["seed"], result["mode"], result["workload"])
+        if key not in baseline or baseline[key] == 0:
+            continue
+        ratio = result["seconds"] / baseline[key]
+        flag = "  REGRESSION" if ratio > REGRESSION else ""
+        print(
+            f"{result['credits']:>10} {result['mode']:<20} "
+            f"{result['workload']:<12} {ratio:6.2f}x{flag}"
+        )
+
+
+if __name__ == "__main__":
+    main()
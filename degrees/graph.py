@@ -0,0 +1,398 @@
+import csv
+import pickle
+from array import array
+from bisect import bisect_left
+from itertools import chain
+
+# Most digits of an id that IdIndex stores as a 64-bit number
+MAX_DIGITS = 18
+
+
+class CompactGraph():
+    """
+    Bipartite person/movie star graph with ids interned to dense integers.
+
+    Adjacency is stored CSR-style: the movies of person `p` are
+    `person_movies[person_offsets[p]:person_offsets[p + 1]]`, and the stars
+    of movie `m` are `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+    Ids, names, births, titles and years are packed into StringTables,
+    so no entity costs a Python object until it is looked up.
+    """
+
+    def __init__(self):
+        # Dense index -> IMDB id, and IMDB id -> dense index
+        self.person_ids = StringTable()
+        self.person_index = IdIndex()
+        self.movie_ids = StringTable()
+        self.movie_index = IdIndex()
+
+        # Per-person and per-movie attributes, indexed by dense id
+        self.person_names = StringTable()
+        self.person_births = StringTable()
+        self.movie_titles = StringTable()
+        self.movie_years = StringTable()
+
+        # People sorted by lowercase name, and people added after loading
+        # by lowercase name
+        self.name_order = array("l")
+        self.extra_names = {}
+
+        # CSR adjacency in both directions
+        self.person_offsets = array("q", [0])
+        self.person_movies = array("l")
+        self.movie_offsets = array("q", [0])
+        self.movie_stars = array("l")
+
+        # Star edges added after loading, which the CSR arrays cannot hold
+        self.extra_movies = {}
+        self.extra_stars = {}
+
+    @classmethod
+    def from_csv(cls, path):
+        """
+        Load people.csv, movies.csv and stars.csv from `path`.
+        """
+        graph = cls()
+
+        # Ids are looked up in dictionaries while loading, which are
+        # then replaced by compact IdIndexes
+        person_index = {}
+        movie_index = {}
+
+        with open(f"{path}/people.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                person_index[row["id"]] = len(graph.person_ids)
+                graph.person_ids.append(row["id"])
+                graph.person_names.append(row["name"])
+                graph.person_births.append(row["birth"])
+
+        with open(f"{path}/movies.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                movie_index[row["id"]] = len(graph.movie_ids)
+                graph.movie_ids.append(row["id"])
+                graph.movie_titles.append(row["title"])
+                graph.movie_years.append(row["year"])
+
+        # Collect star edges as parallel index arrays, skipping unknown ids
+        star_people = array("l")
+        star_movies = array("l")
+        with open(f"{path}/stars.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                p = person_index.get(row["person_id"])
+                m = movie_index.get(row["movie_id"])
+                if p is None or m is None:
+                    continue
+                star_people.append(p)
+                star_movies.append(m)
+
+        graph.person_index = IdIndex(person_index.items())
+        graph.movie_index = IdIndex(movie_index.items())
+        del person_index, movie_index
+
+        names = [name.lower() for name in graph.person_names]
+        graph.name_order = array("l", sorted(range(len(names)), key=names.__getitem__))
+        del names
+
+        graph.person_offsets, graph.person_movies = compress(
+            len(graph.person_ids), star_people, star_movies
+        )
+        graph.movie_offsets, graph.movie_stars = compress(
+            len(graph.movie_ids), star_movies, star_people
+        )
+        return graph
+
+    def save(self, f):
+        """
+        Write the graph to the binary file `f`. A pickled header gives the
+        type, item size and length of every array in `arrays`, and holds
+        the dictionaries; the arrays follow as raw bytes.
+        """
+        layout = []
+        for owner, name in self.arrays():
+            buffer = getattr(owner, name)
+            if isinstance(buffer, array):
+                layout.append((buffer.typecode, buffer.itemsize, len(buffer)))
+            else:
+                layout.append((None, 1, len(buffer)))
+        pickle.dump((layout, self.dictionaries()), f, pickle.HIGHEST_PROTOCOL)
+        for owner, name in self.arrays():
+            f.write(getattr(owner, name))
+
+    @classmethod
+    def load(cls, f):
+        """
+        Read a graph written by `save` from the binary file `f`, reading
+        each array straight into memory rather than unpickling it.
+        Raises ValueError or EOFError if the file does not match.
+        """
+        graph = cls()
+        layout, dictionaries = pickle.load(f)
+        arrays = graph.arrays()
+        if len(layout) != len(arrays):
+            raise ValueError("snapshot has the wrong number of arrays")
+        for (owner, name), (typecode, itemsize, length) in zip(arrays, layout):
+            if typecode is None:
+                buffer = bytearray(length)
+                if f.readinto(buffer) != length:
+                    raise EOFError("snapshot is truncated")
+            else:
+                buffer = array(typecode)
+                if buffer.itemsize != itemsize:
+                    raise ValueError("snapshot was written on another platform")
+                buffer.fromfile(f, length)
+            setattr(owner, name, buffer)
+        (
+            graph.person_index.others, graph.movie_index.others,
+            graph.extra_names, graph.extra_movies, graph.extra_stars
+        ) = dictionaries
+        return graph
+
+    def arrays(self):
+        """
+        Return (object, attribute) pairs naming every array and buffer
+        that holds the graph, in the order `save` writes them.
+        """
+        tables = [
+            self.person_ids, self.person_names, self.person_births,
+            self.movie_ids, self.movie_titles, self.movie_years
+        ]
+        pairs = [(table, name) for table in tables for name in ("data", "offsets")]
+        for index in (self.person_index, self.movie_index):
+            pairs += [(index, "numbers"), (index, "indices")]
+        for name in ("name_order", "person_offsets", "person_movies",
+                     "movie_offsets", "movie_stars"):
+            pairs.append((self, name))
+        return pairs
+
+    def dictionaries(self):
+        """
+        Return the dictionaries that hold the graph, in the order `load`
+        restores them.
+        """
+        return (
+            self.person_index.others, self.movie_index.others,
+            self.extra_names, self.extra_movies, self.extra_stars
+        )
+
+    def movies_of(self, p):
+        """
+        Return the dense movie ids person `p` starred in.
+        """
+        movies = self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+        if p in self.extra_movies:
+            movies += self.extra_movies[p]
+        return movies
+
+    def stars_of(self, m):
+        """
+        Return the dense person ids who starred in movie `m`.
+        """
+        stars = self.movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+        if m in self.extra_stars:
+            stars += self.extra_stars[m]
+        return stars
+
+    def people_named(self, name):
+        """
+        Return the dense ids of people whose lowercase name is `name`.
+        """
+        found = array("l")
+        order = self.name_order
+        i = bisect_left(order, name, key=self.lower_name)
+        while i < len(order) and self.lower_name(order[i]) == name:
+            found.append(order[i])
+            i += 1
+        found.extend(self.extra_names.get(name, ()))
+        return found
+
+    def lower_name(self, p):
+        """
+        Return the name of person `p` in lowercase.
+        """
+        return self.person_names[p].lower()
+
+    def add_person(self, person_id, name, birth):
+        """
+        Add a person with no movies, returning their dense id.
+        """
+        p = len(self.person_ids)
+        self.person_index[person_id] = p
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        self.extra_names.setdefault(name.lower(), array("l")).append(p)
+
+        # An empty CSR row, so only extra_movies holds their movies
+        self.person_offsets.append(self.person_offsets[-1])
+        return p
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Add a movie with no stars, returning its dense id.
+        """
+        m = len(self.movie_ids)
+        self.movie_index[movie_id] = m
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        self.movie_offsets.append(self.movie_offsets[-1])
+        return m
+
+    def add_star(self, p, m):
+        """
+        Record that person `p` starred in movie `m`.
+        Returns whether the edge is new.
+        """
+        if m in self.movies_of(p):
+            return False
+        self.extra_movies.setdefault(p, array("l")).append(m)
+        self.extra_stars.setdefault(m, array("l")).append(p)
+        return True
+
+    def neighbors(self, p):
+        """
+        Return (movie, person) dense id pairs for people
+        who starred with person `p`.
+        """
+        neighbors = set()
+        for m in self.movies_of(p):
+            for q in self.stars_of(m):
+                neighbors.add((m, q))
+        return neighbors
+
+    def iter_neighbors(self, p, seen):
+        """
+        Lazily yield (movie, person) dense id pairs for people who starred
+        with person `p`, skipping `p` and anyone in `seen`.
+
+        CSR rows are read through memoryviews rather than copied, since
+        this runs once for every person a search expands.
+        """
+        person_offsets = self.person_offsets
+        movie_offsets = self.movie_offsets
+        person_movies = memoryview(self.person_movies)
+        movie_stars = memoryview(self.movie_stars)
+        extra_stars = self.extra_stars
+
+        movies = person_movies[person_offsets[p]:person_offsets[p + 1]]
+        for m in chain(movies, self.extra_movies.get(p, ())):
+            for q in movie_stars[movie_offsets[m]:movie_offsets[m + 1]]:
+                if q != p and q not in seen:
+                    yield (m, q)
+            if m in extra_stars:
+                for q in extra_stars[m]:
+                    if q != p and q not in seen:
+                        yield (m, q)
+
+
+class StringTable():
+    """
+    Append-only list of strings packed into one UTF-8 buffer, so that
+    each string costs its bytes and an offset rather than an object.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("q", [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, string):
+        self.data += string.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+
+class IdIndex():
+    """
+    Map from ids to dense indices, built from (id, index) pairs.
+
+    Ids written as plain decimal numbers, as IMDB ids are, are kept as
+    a sorted array of numbers searched by bisection. Any other ids, and
+    ids added after building, are kept in a dictionary.
+    """
+
+    def __init__(self, items=()):
+        numbered = []
+        self.others = {}
+        for key, index in items:
+            number = decimal(key)
+            if number is None:
+                self.others[key] = index
+            else:
+                numbered.append((number, index))
+        numbered.sort()
+        self.numbers = array("q", (number for number, _ in numbered))
+        self.indices = array("l", (index for _, index in numbered))
+
+    def get(self, key, default=None):
+        number = decimal(key)
+        if number is not None:
+            i = bisect_left(self.numbers, number)
+            if i < len(self.numbers) and self.numbers[i] == number:
+                return self.indices[i]
+        return self.others.get(key, default)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        index = self.get(key)
+        if index is None:
+            raise KeyError(key)
+        return index
+
+    def __setitem__(self, key, index):
+        self.others[key] = index
+
+
+def decimal(key):
+    """
+    Returns `key` as an integer if it is a decimal number without leading
+    zeros that fits in 64 bits, or None otherwise.
+    """
+    if (key.isascii() and key.isdigit() and len(key) <= MAX_DIGITS
+            and (key[0] != "0" or key == "0")):
+        return int(key)
+    return None
+
+
+def compress(size, rows, cols):
+    """
+    Build CSR (offsets, indices) arrays for `size` rows from parallel
+    `rows`/`cols` edge arrays, dropping duplicate edges.
+    """
+    # Counting sort of edges by row
+    offsets = array("q", [0]) * (size + 1)
+    for r in rows:
+        offsets[r + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    cursor = array("q", offsets)
+    indices = array("l", [0]) * len(rows)
+    for r, c in zip(rows, cols):
+        indices[cursor[r]] = c
+        cursor[r] += 1
+
+    # Sort and deduplicate each row in place
+    unique = array("q", [0]) * (size + 1)
+    end = 0
+    for i in range(size):
+        row = sorted(set(indices[offsets[i]:offsets[i + 1]]))
+        indices[end:end + len(row)] = array("l", row)
+        end += len(row)
+        unique[i + 1] = end
+    del indices[end:]
+
+    return unique, indices
@@ -0,0 +1,166 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+# Number of trigram candidates checked with edit distance per fuzzy lookup
+CANDIDATES = 200
+
+# Most trigram postings counted per fuzzy lookup
+MAX_POSTINGS = 50_000
+
+
+class NameIndex():
+    """
+    Prefix and typo-tolerant lookup over a set of lowercase names.
+
+    Names are kept sorted in one list per length, so prefixes are answered
+    shortest first by a binary search in each list, stopping once enough
+    names are found. Each trigram of a padded name maps to the positions
+    in `names` of the names containing it.
+    """
+
+    def __init__(self, names):
+        self.names = list(dict.fromkeys(names))
+        self.by_length = {}
+        for name in self.names:
+            self.by_length.setdefault(len(name), []).append(name)
+        for names in self.by_length.values():
+            names.sort()
+        self.lengths = sorted(self.by_length)
+
+        self.trigrams = {}
+        for i, name in enumerate(self.names):
+            self.index(i, name)
+
+    def index(self, i, name):
+        """
+        Add position `i` to the postings of each trigram of `name`.
+        """
+        length = len(name)
+        for gram in trigrams(name):
+            by_length = self.trigrams.get(gram)
+            if by_length is None:
+                by_length = self.trigrams[gram] = {}
+            postings = by_length.get(length)
+            if postings is None:
+                postings = by_length[length] = array("l")
+            postings.append(i)
+
+    def prefix(self, prefix, limit=None):
+        """
+        Return names starting with `prefix`, shortest first.
+        """
+        matches = []
+        for length in self.lengths[bisect_left(self.lengths, len(prefix)):]:
+            names = self.by_length[length]
+            i = bisect_left(names, prefix)
+            while i < len(names) and names[i].startswith(prefix):
+                if limit is not None and len(matches) >= limit:
+                    return matches
+                matches.append(names[i])
+                i += 1
+        return matches
+
+    def fuzzy(self, query, limit=None):
+        """
+        Return (name, distance) pairs for names within a few edits of
+        `query`, closest first.
+
+        Each edit changes the length by at most one and at most three
+        trigrams, so a name within `max_distance` edits has a length within
+        `max_distance` of the query's and shares one of any
+        3 * max_distance + 1 of its trigrams. Postings are kept per trigram
+        and name length, and candidates are counted only over the postings
+        of those lengths for the rarest trigrams. At most MAX_POSTINGS
+        postings are counted, so a query made only of very common trigrams
+        checks just a sample of the names sharing them.
+        """
+        max_distance = max(1, len(query) // 4)
+        lengths = range(len(query) - max_distance, len(query) + max_distance + 1)
+        postings = []
+        for gram in set(trigrams(query)):
+            by_length = self.trigrams.get(gram, {})
+            postings.append([
+                by_length[length] for length in lengths if length in by_length
+            ])
+        postings.sort(key=lambda arrays: sum(map(len, arrays)))
+
+        counts = Counter()
+        budget = MAX_POSTINGS
+        for arrays in postings[:3 * max_distance + 1]:
+            for gram_postings in arrays:
+                counts.update(gram_postings[:budget])
+                budget -= len(gram_postings)
+                if budget <= 0:
+                    break
+            if budget <= 0:
+                break
+
+        matches = []
+        for i, _ in counts.most_common(CANDIDATES):
+            name = self.names[i]
+            distance = edit_distance(query, name, max_distance)
+            if distance is not None:
+                matches.append((name, distance))
+        matches.sort(key=lambda match: (match[1], len(match[0]), match[0]))
+        return matches[:limit]
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` names matching `query`: an exact match first,
+        then names with `query` as a prefix, then names with typos.
+        """
+        query = query.lower().strip()
+        matches = self.prefix(query, limit)
+        if len(matches) >= limit:
+            return matches
+        for name, _ in self.fuzzy(query, limit):
+            if name not in matches:
+                matches.append(name)
+        return matches[:limit]
+
+    def add(self, name):
+        """
+        Add a name to the index, if it is not there already.
+        """
+        names = self.by_length.get(len(name))
+        if names is None:
+            names = self.by_length[len(name)] = []
+            insort(self.lengths, len(name))
+        i = bisect_left(names, name)
+        if i < len(names) and names[i] == name:
+            return
+        names.insert(i, name)
+        self.index(len(self.names), name)
+        self.names.append(name)
+
+
+def trigrams(name):
+    """
+    Return the trigrams of `name`, padded so short names and
+    word boundaries produce trigrams too.
+    """
+    padded = f"  {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b, limit):
+    """
+    Return the Levenshtein distance between `a` and `b`,
+    or None if it is greater than `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (x != y)
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
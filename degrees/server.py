@@ -0,0 +1,188 @@
+import functools
+import json
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+
+# Default number of shortest_path results kept in the cache
+CACHE_SIZE = 4096
+
+# Number of recent queries whose latency is kept for percentiles
+LATENCY_WINDOW = 1000
+
+# Optional command-line flags accepted by main, besides --port and --cache
+FLAGS = ["--compact", "--bidirectional", "--components", "--landmarks"]
+
+
+class QueryService():
+    """
+    Answers path and degree queries against the loaded graph, caching
+    recent shortest_path results and recording query latencies.
+    """
+
+    def __init__(self, cache_size=CACHE_SIZE, bidirectional=False):
+        self.bidirectional = bidirectional
+        self.cached_path = functools.lru_cache(maxsize=cache_size)(self.find_path)
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.total_latency = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def find_path(self, source, target):
+        path = degrees.shortest_path(source, target, bidirectional=self.bidirectional)
+        return None if path is None else tuple(path)
+
+    def path(self, source, target):
+        """
+        Returns the result of a path query between two people,
+        given as IMDB ids or unambiguous names.
+        """
+        start = time.perf_counter()
+        try:
+            source_id = degrees.resolve_person(source)
+            target_id = degrees.resolve_person(target)
+            path = self.cached_path(source_id, target_id)
+            return {
+                "source_id": source_id,
+                "target_id": target_id,
+                "degrees": None if path is None else len(path),
+                "path": None if path is None else [list(step) for step in path]
+            }
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def degrees(self, source, target):
+        """
+        Returns the result of a degrees query, which is a path query
+        without the path.
+        """
+        result = self.path(source, target)
+        del result["path"]
+        return result
+
+    def record(self, latency):
+        with self.lock:
+            self.queries += 1
+            self.total_latency += latency
+            self.latencies.append(latency)
+
+    def stats(self):
+        """
+        Returns cache and latency statistics.
+        """
+        info = self.cached_path.cache_info()
+        lookups = info.hits + info.misses
+        with self.lock:
+            latencies = sorted(self.latencies)
+            queries = self.queries
+            total_latency = self.total_latency
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "queries": queries,
+            "cache": {
+                "size": info.currsize,
+                "max_size": info.maxsize,
+                "hits": info.hits,
+                "misses": info.misses,
+                "hit_rate": info.hits / lookups if lookups else None
+            },
+            "latency": {
+                "mean": total_latency / queries if queries else None,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1] if latencies else None
+            }
+        }
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Serves GET /path, /degrees and /stats as JSON.
+    /path and /degrees take `source` and `target` query parameters.
+    """
+
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/stats":
+                self.respond(200, self.service.stats())
+            elif url.path in ("/path", "/degrees"):
+                if "source" not in params or "target" not in params:
+                    raise ValueError("expected source and target parameters")
+                query = getattr(self.service, url.path[1:])
+                self.respond(200, query(params["source"], params["target"]))
+            else:
+                self.respond(404, {"error": f"unknown endpoint: {url.path}"})
+        except ValueError as e:
+            self.respond(400, {"error": str(e)})
+
+    def respond(self, status, body):
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        # Keep request logging off stderr; /stats reports on queries instead
+        pass
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    port = 8000
+    cache_size = CACHE_SIZE
+    for flag in flags:
+        if flag.startswith("--port="):
+            port = int(flag[len("--port="):])
+        elif flag.startswith("--cache="):
+            cache_size = int(flag[len("--cache="):])
+        elif flag not in FLAGS:
+            sys.exit(
+                "Usage: python server.py [directory] [--port=N] [--cache=N] "
+                f"[{'] ['.join(FLAGS)}]"
+            )
+    if len(args) > 1:
+        sys.exit("Usage: python server.py [directory]")
+    directory = args[0] if args else "large"
+
+    # Load the graph once for every request
+    print("Loading data...")
+    degrees.load_data(
+        directory,
+        compact="--compact" in flags,
+        components="--components" in flags,
+        landmarks=degrees.LANDMARKS if "--landmarks" in flags else 0
+    )
+    print("Data loaded.")
+
+    QueryHandler.service = QueryService(
+        cache_size=cache_size, bidirectional="--bidirectional" in flags
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+    print(f"Serving on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
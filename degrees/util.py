@@ -1,19 +1,29 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
         self.parent = parent
         self.action = action
+        self.depth = 0 if parent is None else parent.depth + 1
 
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+
+        # Number of nodes in the frontier for each state
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,10 +32,17 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self.discard(node)
             return node
 
+    def discard(self, node):
+        count = self.states[node.state] - 1
+        if count:
+            self.states[node.state] = count
+        else:
+            del self.states[node.state]
+
 
 class QueueFrontier(StackFrontier):
 
@@ -33,6 +50,54 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self.discard(node)
             return node
+
+
+class SearchStats():
+    """
+    Counters and per-phase timings collected while answering queries.
+    """
+
+    def __init__(self):
+        self.nodes_expanded = 0
+        self.peak_frontier = 0
+        self.neighbors_generated = 0
+
+        # Maps phase names to total seconds spent in them
+        self.timings = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    def count(self, neighbors):
+        """
+        Wrap a neighbors function so every expansion and every
+        neighbor it generates is counted.
+        """
+        def counted(state, *args):
+            self.nodes_expanded += 1
+            for neighbor in neighbors(state, *args):
+                self.neighbors_generated += 1
+                yield neighbor
+        return counted
+
+    def frontier(self, size):
+        self.peak_frontier = max(self.peak_frontier, size)
+
+    def __str__(self):
+        lines = [
+            f"Nodes expanded: {self.nodes_expanded}",
+            f"Peak frontier: {self.peak_frontier}",
+            f"Neighbors generated: {self.neighbors_generated}",
+        ]
+        for name, elapsed in self.timings.items():
+            lines.append(f"Time ({name}): {elapsed:.4f}s")
+        return "\n".join(lines)
@@ -0,0 +1,239 @@
+import heapq
+import itertools
+
+# Values each kind of variable can take
+DOMAINS = {
+    "gene": (2, 1, 0),
+    "trait": (True, False)
+}
+
+
+class Factor():
+    """
+    Table of non-negative values over every assignment to `variables`,
+    each a (person, "gene") or (person, "trait") pair. `table` maps
+    tuples of values, in the order of `variables`, to numbers.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    def multiply(self, other, domains):
+        """
+        Return the product of this factor and `other`.
+        """
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables
+        )
+        mine = [variables.index(v) for v in self.variables]
+        theirs = [variables.index(v) for v in other.variables]
+        table = {}
+        for values in itertools.product(*(domains[v] for v in variables)):
+            table[values] = (
+                self.table[tuple(values[i] for i in mine)]
+                * other.table[tuple(values[i] for i in theirs)]
+            )
+        return Factor(variables, table)
+
+    def marginalize(self, variables):
+        """
+        Return the factor over `variables`, a subset of this factor's
+        variables, with every other variable summed out.
+        """
+        variables = tuple(v for v in self.variables if v in variables)
+        keep = [self.variables.index(v) for v in variables]
+        table = {}
+        for values, p in self.table.items():
+            key = tuple(values[i] for i in keep)
+            table[key] = table.get(key, 0) + p
+        return Factor(variables, table)
+
+    def normalize(self):
+        """
+        Return this factor scaled so that its values sum to 1.
+        """
+        total = sum(self.table.values())
+        return Factor(
+            self.variables, {values: p / total for values, p in self.table.items()}
+        )
+
+
+def family_factors(people, probs):
+    """
+    Compile a family, as returned by `load_data`, into factors built from
+    `probs`, together with the domain of each variable.
+
+    Every person has a gene factor, which is their unconditional gene
+    distribution if they have no parents listed, or the chance of inheriting
+    each number of copies given their parents' genes otherwise, and a trait
+    factor given their genes. A known trait limits the trait's domain to
+    the known value.
+    """
+    domains = {}
+    factors = []
+    for person, data in people.items():
+        gene = (person, "gene")
+        trait = (person, "trait")
+        domains[gene] = DOMAINS["gene"]
+        domains[trait] = (
+            DOMAINS["trait"] if data["trait"] is None else (data["trait"],)
+        )
+
+        if data["mother"] is None and data["father"] is None:
+            factors.append(Factor(
+                [gene], {(g,): probs["gene"][g] for g in DOMAINS["gene"]}
+            ))
+        else:
+            parents = [(data["mother"], "gene"), (data["father"], "gene")]
+            factors.append(Factor([gene] + parents, {
+                (g, mother, father): inheritance(g, mother, father, probs)
+                for g, mother, father in itertools.product(DOMAINS["gene"], repeat=3)
+            }))
+
+        factors.append(Factor([trait, gene], {
+            (t, g): probs["trait"][g][t]
+            for t in domains[trait] for g in DOMAINS["gene"]
+        }))
+    return factors, domains
+
+
+def inheritance(gene, mother, father, probs):
+    """
+    Return the probability of a child having `gene` copies of the gene
+    given the number of copies of each parent.
+    """
+    def passes(parent):
+        if parent == 2:
+            return 1 - probs["mutation"]
+        elif parent == 1:
+            return 0.5
+        return probs["mutation"]
+
+    mom, dad = passes(mother), passes(father)
+    if gene == 2:
+        return mom * dad
+    elif gene == 1:
+        return mom * (1 - dad) + dad * (1 - mom)
+    return (1 - mom) * (1 - dad)
+
+
+def marginals(people, probs):
+    """
+    Return every person's gene and trait distributions given the known
+    traits, in the form `main` prints them, by exact inference.
+
+    Variables are eliminated one at a time, always picking one with the
+    fewest neighbors, and each elimination leaves a clique of the variable
+    and its neighbors. Those cliques form a junction tree, over which two
+    passes of messages give every marginal at once. For tree-shaped
+    pedigrees the cliques never hold more than a child and its parents,
+    so this takes time linear in the size of the family, where
+    enumerating assignments takes time exponential in it.
+    """
+    factors, domains = family_factors(people, probs)
+    cliques, parents, eliminated = junction_tree(factors, domains)
+
+    # Each factor goes to the clique of its first eliminated variable,
+    # which holds all of its variables
+    potentials = [
+        Factor(clique, {values: 1.0 for values in itertools.product(
+            *(domains[v] for v in clique)
+        )})
+        for clique in cliques
+    ]
+    for factor in factors:
+        i = min(eliminated[v] for v in factor.variables)
+        potentials[i] = potentials[i].multiply(factor, domains)
+
+    # Cliques are numbered in elimination order, so children always come
+    # before their parent: collect messages upwards, then distribute
+    # them downwards. Messages are normalized, since their products would
+    # otherwise underflow in large families
+    children = [[] for _ in cliques]
+    for i, parent in enumerate(parents):
+        if parent is not None:
+            children[parent].append(i)
+    upward = {}
+    for i, parent in enumerate(parents):
+        if parent is not None:
+            belief = product(potentials[i], [upward[c] for c in children[i]], domains)
+            upward[i] = belief.marginalize(
+                set(cliques[i]) & set(cliques[parent])
+            ).normalize()
+    downward = {}
+    for i in reversed(range(len(cliques))):
+        for child in children[i]:
+            incoming = [upward[c] for c in children[i] if c != child]
+            if parents[i] is not None:
+                incoming.append(downward[i])
+            belief = product(potentials[i], incoming, domains)
+            downward[child] = belief.marginalize(
+                set(cliques[i]) & set(cliques[child])
+            ).normalize()
+
+    probabilities = {
+        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for person in people
+    }
+    for i, clique in enumerate(cliques):
+        incoming = [upward[c] for c in children[i]]
+        if parents[i] is not None:
+            incoming.append(downward[i])
+        belief = product(potentials[i], incoming, domains)
+
+        # Each clique starts with the variable eliminated there
+        person, field = clique[0]
+        marginal = belief.marginalize({clique[0]}).normalize()
+        for (value,), p in marginal.table.items():
+            probabilities[person][field][value] = p
+    return probabilities
+
+
+def junction_tree(factors, domains):
+    """
+    Return the cliques left by eliminating every variable in `domains`,
+    the index of each clique's parent clique (None for roots), and the
+    index of the clique at which each variable was eliminated.
+    """
+    neighbors = {variable: set() for variable in domains}
+    for factor in factors:
+        for a, b in itertools.permutations(factor.variables, 2):
+            neighbors[a].add(b)
+
+    cliques = []
+    eliminated = {}
+    order = {variable: i for i, variable in enumerate(domains)}
+
+    # Heap of (neighbor count, order, variable), with stale entries skipped
+    heap = [(len(neighbors[v]), order[v], v) for v in neighbors]
+    heapq.heapify(heap)
+    while heap:
+        degree, _, variable = heapq.heappop(heap)
+        if variable not in neighbors or degree != len(neighbors[variable]):
+            continue
+        remaining = neighbors.pop(variable)
+        eliminated[variable] = len(cliques)
+        cliques.append((variable,) + tuple(sorted(remaining, key=order.get)))
+
+        # Eliminating a variable connects all of its neighbors
+        for a in remaining:
+            neighbors[a].discard(variable)
+            neighbors[a].update(b for b in remaining if b != a)
+            heapq.heappush(heap, (len(neighbors[a]), order[a], a))
+
+    # A clique's parent is where the first of its other variables goes
+    parents = [
+        min((eliminated[v] for v in clique[1:]), default=None)
+        for clique in cliques
+    ]
+    return cliques, parents, eliminated
+
+
+def product(factor, others, domains):
+    """
+    Return the product of `factor` and every factor in `others`.
+    """
+    for other in others:
+        factor = factor.multiply(other, domains)
+    return factor
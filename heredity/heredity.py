@@ -2,6 +2,8 @@ import csv
 import itertools
 import sys
 
+from factors import marginals
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,15 +38,43 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Optional command-line flags accepted by main
+FLAGS = ["--enumerate"]
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    if len(args) != 1 or any(flag not in FLAGS for flag in flags):
+        sys.exit(f"Usage: python heredity.py data.csv [{'] ['.join(FLAGS)}]")
+    people = load_data(args[0])
 
     # Keep track of gene and trait probabilities for each person
+    if "--enumerate" in flags:
+        probabilities = enumerate_probabilities(people)
+    else:
+        probabilities = marginals(people, PROBS)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Return every person's gene and trait distributions by summing
+    `joint_probability` over every assignment of genes and traits that
+    agrees with the known traits. This takes time exponential in the size
+    of the family; `factors.marginals` gives the same answer in linear time
+    for tree-shaped families.
+    """
     probabilities = {
         person: {
             "gene": {
@@ -83,15 +113,7 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
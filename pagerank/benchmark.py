@@ -0,0 +1,264 @@
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import pagerank
+from crawler import crawl_edge_list, crawl_graph
+from edgelist import write_edge_list
+from linkgraph import LinkGraph
+from solvers import SOLVERS, jacobi
+
+# Default corpus sizes, in pages
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Largest corpus also written out as HTML files, to time the crawlers
+HTML_LIMIT = 100_000
+
+# Fraction of pages without links
+DANGLING_FRACTION = 0.1
+
+# Exponents of the power laws followed by out-degree, and by how often a
+# page is linked to according to its popularity rank
+OUT_DEGREE_EXPONENT = 2.1
+POPULARITY_EXPONENT = 0.9
+
+# Most links on any one page
+MAX_OUT_DEGREE = 1000
+
+# L1 tolerance of the reference ranks that errors are measured against
+REFERENCE_TOLERANCE = 1e-10
+
+# Ratio above which a result is reported as a regression by --compare
+REGRESSION = 1.2
+
+# Folder holding generated corpora
+folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    flags = dict(
+        arg[2:].split("=", 1) for arg in sys.argv[1:]
+        if arg.startswith("--") and "=" in arg
+    )
+    if any(flag not in ("output", "seed", "compare") for flag in flags):
+        sys.exit(
+            "Usage: python benchmark.py [pages ...] "
+            "[--output=results.jsonl] [--seed=N] [--compare=baseline.jsonl]"
+        )
+    sizes = [int(arg) for arg in args] or SIZES
+    seed = int(flags.get("seed", 0))
+    output = flags.get("output", "benchmark.jsonl")
+
+    results = []
+    for pages in sizes:
+        for result in run(pages, seed):
+            error = result["l1_error"]
+            print(
+                f"{pages:>10} {result['engine']:<26} {result['seconds']:10.4f}s "
+                f"{result['peak_memory'] / 2 ** 20:10.1f} MiB  "
+                f"L1 error {'-' if error is None else f'{error:.2e}'}"
+            )
+            results.append(result)
+
+    with open(output, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+    if "compare" in flags:
+        compare(flags["compare"], results)
+
+
+def generate(pages, seed):
+    """
+    Return a LinkGraph of `pages` pages named "0.html", "1.html", ... whose
+    out-degrees and in-degrees both follow power laws. DANGLING_FRACTION of
+    the pages have no links. The same seed always gives the same graph.
+    """
+    rng = np.random.default_rng(seed)
+    out_degree = np.minimum(
+        rng.zipf(OUT_DEGREE_EXPONENT, pages), min(MAX_OUT_DEGREE, pages - 1)
+    )
+    out_degree[rng.random(pages) < DANGLING_FRACTION] = 0
+    sources = np.repeat(np.arange(pages), out_degree)
+
+    # Targets are drawn by popularity, and popularity ranks are shuffled
+    # so that the most linked pages are spread over the corpus
+    weights = np.cumsum(1 / np.arange(1, pages + 1) ** POPULARITY_EXPONENT)
+    ranks = np.searchsorted(weights, rng.random(len(sources)) * weights[-1])
+    targets = rng.permutation(pages)[np.minimum(ranks, pages - 1)]
+
+    # Drop links from a page to itself and repeated links
+    keys = np.unique(sources * pages + targets)
+    keys = keys[keys // pages != keys % pages]
+    names = [f"{i}.html" for i in range(pages)]
+    return LinkGraph(names, keys // pages, keys % pages)
+
+
+def write_html(graph, path):
+    """
+    Write `graph` to `path` as a corpus of HTML files, one per page.
+    """
+    os.makedirs(path, exist_ok=True)
+    for i, page in enumerate(graph.pages):
+        links = graph.out_links[graph.out_indptr[i]:graph.out_indptr[i + 1]]
+        with open(os.path.join(path, page), "w") as f:
+            f.write("<html><body>\n")
+            for j in links:
+                f.write(f'<a href="{graph.pages[j]}">{graph.pages[j]}</a>\n')
+            f.write("</body></html>\n")
+
+
+def engines(graph, directory, html=None):
+    """
+    Return (name, function) pairs for each engine worth timing on `graph`,
+    where each function returns a rank vector in the graph's page order,
+    or None for the crawlers, which only time reading the HTML corpus in
+    `html`. Scratch files go in `directory`. Engines that would take too
+    long on a graph this size are left out.
+    """
+    n = len(graph)
+    samples = max(pagerank.SAMPLES, 10 * n)
+    damping = pagerank.DAMPING
+    edge_list = os.path.join(directory, pagerank.EDGE_LIST)
+
+    def vector(ranks):
+        return np.array([ranks[page] for page in graph.pages])
+
+    def out_links():
+        for i in range(n):
+            yield graph.out_links[graph.out_indptr[i]:graph.out_indptr[i + 1]].tolist()
+
+    def out_of_core():
+        edges = write_edge_list(edge_list, graph.pages, out_links())
+        return pagerank.power_iteration(edges, damping)
+
+    def crawl():
+        pagerank.crawl(html, cache=False)
+
+    def crawl_to_graph():
+        crawl_graph(html)
+
+    def crawl_to_edge_list():
+        crawl_edge_list(html, edge_list)
+
+    selected = []
+    if html is not None:
+        selected += [
+            ("crawl", crawl),
+            ("crawl_graph", crawl_to_graph),
+            ("crawl_edge_list", crawl_to_edge_list)
+        ]
+    if n <= 1_000:
+        corpus = graph.to_corpus()
+        selected += [
+            ("sample_pagerank", lambda: vector(
+                pagerank.sample_pagerank(corpus, damping, samples)
+            )),
+            ("iterate_pagerank", lambda: vector(
+                pagerank.iterate_pagerank(corpus, damping)
+            ))
+        ]
+    if n <= 100_000:
+        selected.append(("sample_pagerank_fast", lambda: vector(
+            pagerank.sample_pagerank_fast(graph, damping, samples)
+        )))
+    selected += [
+        ("sample_pagerank_batched", lambda: vector(
+            pagerank.sample_pagerank_batched(graph, damping, samples)
+        )),
+        ("sample_pagerank_parallel", lambda: vector(
+            pagerank.sample_pagerank_parallel(graph, damping, samples, seed=0)
+        )),
+        ("iterate_pagerank_sparse", lambda: vector(
+            pagerank.iterate_pagerank_sparse(graph, damping)
+        )),
+        ("out_of_core", out_of_core)
+    ]
+    for name, solver in SOLVERS.items():
+        selected.append((
+            f"solver_{name}",
+            lambda solver=solver: solver(graph, damping)
+        ))
+    return selected
+
+
+def run(pages, seed):
+    """
+    Time each engine on a generated corpus of `pages` pages, and measure
+    its peak traced memory and the L1 error of its ranks against a
+    high-precision reference. Returns a list of result records.
+
+    Each engine runs twice: once for time, and once under tracemalloc,
+    which slows Python code down, for memory and ranks. Memory used in
+    worker processes is not traced.
+    """
+    graph = generate(pages, seed)
+    reference = jacobi(graph, pagerank.DAMPING, tolerance=REFERENCE_TOLERANCE)
+
+    directory = os.path.join(folder, f"{pages}-{seed}")
+    os.makedirs(directory, exist_ok=True)
+    html = None
+    if pages <= HTML_LIMIT:
+        html = os.path.join(directory, "html")
+        if not os.path.exists(os.path.join(html, graph.pages[-1])):
+            print(f"Writing {pages} HTML pages...")
+            write_html(graph, html)
+
+    results = []
+    for engine, function in engines(graph, directory, html):
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        ranks = function()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results.append({
+            "suite": "pagerank",
+            "pages": pages,
+            "links": len(graph.sources),
+            "seed": seed,
+            "engine": engine,
+            "seconds": seconds,
+            "peak_memory": peak_memory,
+            "l1_error": None if ranks is None else float(np.abs(ranks - reference).sum()),
+            "python": platform.python_version(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+        })
+    return results
+
+
+def compare(filename, results):
+    """
+    Print the ratio of each result's time to the latest matching result
+    in a previous results file, flagging regressions.
+    """
+    baseline = {}
+    with open(filename) as f:
+        for line in f:
+            result = json.loads(line)
+            if result.get("suite") != "pagerank":
+                continue
+            key = (result["pages"], result["seed"], result["engine"])
+            baseline[key] = result["seconds"]
+
+    print("Comparison with", filename)
+    for result in results:
+        key = (result["pages"], result["seed"], result["engine"])
+        if key not in baseline or baseline[key] == 0:
+            continue
+        ratio = result["seconds"] / baseline[key]
+        flag = "  REGRESSION" if ratio > REGRESSION else ""
+        print(f"{result['pages']:>10} {result['engine']:<26} {ratio:6.2f}x{flag}")
+
+
+if __name__ == "__main__":
+    main()
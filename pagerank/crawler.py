@@ -0,0 +1,119 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from edgelist import write_edge_list
+from linkgraph import LinkGraph
+
+# Same link pattern as `crawl`, compiled once, matched against the raw
+# bytes of each file so that nothing is decoded
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Bytes read from a file at a time
+CHUNK_SIZE = 1 << 16
+
+# Files parsed per batch by crawl_edge_list, which bounds the extracted
+# links waiting to be written
+FILE_BATCH = 4096
+
+# Files parsed by each task submitted to the thread pool, so that the cost
+# of a task is spread over many files
+TASK_FILES = 256
+
+
+def crawl_graph(directory, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Parse a directory of HTML pages like `crawl`, but return the link
+    structure directly as a LinkGraph.
+
+    Files are read by a thread pool, TASK_FILES per task, in chunks of
+    `chunk_size` bytes, and links are resolved to page indices as
+    they are extracted, in a single pass over each file.
+    """
+    pages = [
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    ]
+    index = {os.fsencode(page): i for i, page in enumerate(pages)}
+
+    sources = []
+    targets = []
+    with ThreadPoolExecutor(workers) as executor:
+        all_links = extract_links(executor, directory, pages, index, chunk_size)
+        for i, links in enumerate(all_links):
+            links.discard(i)
+            sources.extend([i] * len(links))
+            targets.extend(links)
+    return LinkGraph(pages, sources, targets)
+
+
+def crawl_edge_list(directory, path, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Parse a directory of HTML pages like `crawl_graph`, but write the link
+    structure to the directory `path` as an on-disk edge list, returned as
+    an EdgeList. Files are parsed FILE_BATCH at a time, so the links of
+    only a batch of pages are held in memory at once.
+    """
+    pages = [
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    ]
+    index = {os.fsencode(page): i for i, page in enumerate(pages)}
+
+    def links():
+        with ThreadPoolExecutor(workers) as executor:
+            for first in range(0, len(pages), FILE_BATCH):
+                yield from extract_links(
+                    executor, directory, pages[first:first + FILE_BATCH],
+                    index, chunk_size
+                )
+
+    return write_edge_list(path, pages, links())
+
+
+def extract_links(executor, directory, pages, index, chunk_size=CHUNK_SIZE):
+    """
+    Yield the set of page indices linked to by each of `pages`, in order,
+    parsing the files in `directory` on `executor` TASK_FILES at a time.
+    """
+    def extract(batch):
+        return [
+            page_links(os.path.join(directory, page), index, chunk_size)
+            for page in batch
+        ]
+
+    batches = (
+        pages[first:first + TASK_FILES]
+        for first in range(0, len(pages), TASK_FILES)
+    )
+    for links in executor.map(extract, batches):
+        yield from links
+
+
+def page_links(filename, index, chunk_size=CHUNK_SIZE):
+    """
+    Return the set of page indices, according to `index`, linked to by
+    an HTML file, reading it `chunk_size` bytes at a time. `index` maps
+    page names, encoded like file names, to indices; links to pages not
+    in `index` are ignored.
+    """
+    links = set()
+    carry = b""
+    with open(filename, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer = carry + chunk
+
+            # A short read is the end of the file, which most files fit in;
+            # otherwise hold back a tag that may continue into the next chunk
+            end = len(chunk) < chunk_size
+            cut = -1 if end else buffer.rfind(b"<")
+            if cut != -1 and buffer.find(b">", cut) == -1:
+                buffer, carry = buffer[:cut], buffer[cut:]
+            else:
+                carry = b""
+
+            links.update(map(index.get, LINK.findall(buffer)))
+            if end:
+                links.discard(None)
+                return links
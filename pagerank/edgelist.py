@@ -0,0 +1,159 @@
+import os
+
+import numpy as np
+
+# One link in an edge list file, as page indices
+EDGE = np.dtype([("source", "<i4"), ("target", "<i4")])
+
+# Links held in memory at a time while sorting or iterating
+BLOCK_EDGES = 1 << 20
+
+# Files making up an edge list directory
+PAGES_FILE = "pages.txt"
+EDGES_FILE = "edges.bin"
+DEGREE_FILE = "out_degree.npy"
+
+
+class EdgeList():
+    """
+    Link graph stored on disk, for corpora too large to hold as Python
+    objects.
+
+    `pages.txt` lists page names, one per line, `edges.bin` holds binary
+    (source, target) records sorted by target, and `out_degree.npy` holds
+    each page's number of links. Edges are memory-mapped and read a block
+    at a time, so only arrays with one entry per page stay in memory.
+    Like LinkGraph, it can be passed to `power_iteration` and `jacobi`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.out_degree = np.load(os.path.join(path, DEGREE_FILE))
+        self.dangling = self.out_degree == 0
+        filename = os.path.join(path, EDGES_FILE)
+        if os.path.getsize(filename):
+            self.edges = np.memmap(filename, dtype=EDGE, mode="r")
+        else:
+            # Empty files cannot be memory-mapped
+            self.edges = np.zeros(0, dtype=EDGE)
+
+    def __len__(self):
+        return len(self.out_degree)
+
+    def propagate(self, weights):
+        """
+        Return, for every page, the sum of `weights` over the pages
+        linking to it, streaming over the edges block by block.
+        """
+        result = np.zeros(len(self))
+        for first in range(0, len(self.edges), BLOCK_EDGES):
+            block = self.edges[first:first + BLOCK_EDGES]
+            targets = block["target"]
+
+            # Blocks are sorted by target, so each covers a run of pages
+            low = targets[0]
+            high = targets[-1] + 1
+            result[low:high] += np.bincount(
+                targets - low, weights=weights[block["source"]],
+                minlength=high - low
+            )
+        return result
+
+    def step(self, ranks, damping_factor):
+        """
+        Apply one step of the PageRank random surfer to `ranks`.
+        """
+        n = len(self)
+        share = np.divide(
+            ranks, self.out_degree, out=np.zeros(n), where=~self.dangling
+        )
+        dangling_mass = ranks[self.dangling].sum()
+        return (
+            (1 - damping_factor) / n
+            + damping_factor * (self.propagate(share) + dangling_mass / n)
+        )
+
+    def pages(self):
+        """
+        Yield page names in index order.
+        """
+        with open(os.path.join(self.path, PAGES_FILE), encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+    def ranks_dict(self, ranks):
+        """
+        Return a rank vector as a dictionary from page to rank.
+        """
+        return {page: float(rank) for page, rank in zip(self.pages(), ranks)}
+
+
+def write_edge_list(path, pages, links):
+    """
+    Write an edge list for `pages` to the directory `path` and return it
+    as an EdgeList. `links` yields, for each page in order, the indices of
+    the pages it links to; links from a page to itself are dropped.
+
+    Links are first appended to a scratch file in the order they arrive,
+    then moved into place by a counting sort on their targets, one block
+    at a time, so no more than BLOCK_EDGES links are ever in memory.
+    """
+    os.makedirs(path, exist_ok=True)
+    n = len(pages)
+    with open(os.path.join(path, PAGES_FILE), "w", encoding="utf-8") as f:
+        for page in pages:
+            f.write(f"{page}\n")
+
+    out_degree = np.zeros(n, dtype=np.int64)
+    in_degree = np.zeros(n, dtype=np.int64)
+    sources = []
+    targets = []
+
+    def flush(f):
+        block = np.empty(len(sources), dtype=EDGE)
+        block["source"] = sources
+        block["target"] = targets
+        out_degree[:] += np.bincount(block["source"], minlength=n)
+        in_degree[:] += np.bincount(block["target"], minlength=n)
+        f.write(block.tobytes())
+        sources.clear()
+        targets.clear()
+
+    scratch = os.path.join(path, f"{EDGES_FILE}.tmp")
+    with open(scratch, "wb") as f:
+        for source, page_links in enumerate(links):
+            for target in page_links:
+                if target != source:
+                    sources.append(source)
+                    targets.append(target)
+            if len(sources) >= BLOCK_EDGES:
+                flush(f)
+        flush(f)
+
+    total = int(in_degree.sum())
+    filename = os.path.join(path, EDGES_FILE)
+    if total:
+        edges = np.memmap(filename, dtype=EDGE, mode="w+", shape=(total,))
+        unsorted = np.memmap(scratch, dtype=EDGE, mode="r")
+
+        # Next free position for each target's links
+        cursor = np.zeros(n, dtype=np.int64)
+        np.cumsum(in_degree[:-1], out=cursor[1:])
+        for first in range(0, total, BLOCK_EDGES):
+            block = np.sort(unsorted[first:first + BLOCK_EDGES], order="target")
+            keys = block["target"]
+
+            # Position of each link among the block's links to its target
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            counts = np.diff(np.r_[starts, len(block)])
+            rank = np.arange(len(block)) - np.repeat(starts, counts)
+            edges[cursor[keys] + rank] = block
+            cursor[keys[starts]] += counts
+        edges.flush()
+        del edges, unsorted
+    else:
+        open(filename, "wb").close()
+    os.remove(scratch)
+
+    np.save(os.path.join(path, DEGREE_FILE), out_degree)
+    return EdgeList(path)
@@ -0,0 +1,229 @@
+import numpy as np
+import scipy.sparse
+
+
+class LinkGraph():
+    """
+    Link structure of a corpus with pages interned to dense integers.
+
+    Incoming links are stored CSR-style, sorted by target: the pages
+    linking to page `i` are `sources[indptr[i]:indptr[i + 1]]`, and
+    `targets` repeats `i` once for each of them. Outgoing links are
+    stored the same way: page `i` links to
+    `out_links[out_indptr[i]:out_indptr[i + 1]]`.
+    """
+
+    def __init__(self, pages, sources, targets):
+        """
+        Build the graph for `pages` from parallel arrays of link
+        sources and targets, given as page indices.
+        """
+        self.pages = list(pages)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+
+        # Links are sorted on a single integer key, which is much faster
+        # than sorting on two
+        n = len(self.pages)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        order = np.argsort(targets * n + sources)
+        self.sources = sources[order]
+        self.targets = targets[order]
+
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.targets, minlength=n), out=self.indptr[1:])
+        self.out_degree = np.bincount(self.sources, minlength=n)
+
+        # Pages without links are treated as linking to every page
+        self.dangling = self.out_degree == 0
+
+        order = np.argsort(self.sources * n + self.targets)
+        self.out_links = self.targets[order]
+        self.out_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(self.out_degree, out=self.out_indptr[1:])
+
+        # Incoming links as a sparse matrix, built when first needed
+        self.incoming = None
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the graph for a corpus as returned by `crawl`. Links to pages
+        outside the corpus and links from a page to itself are ignored.
+        """
+        pages = list(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources = []
+        targets = []
+        for page in pages:
+            for link in corpus[page]:
+                if link in index and link != page:
+                    sources.append(index[page])
+                    targets.append(index[link])
+        return cls(pages, sources, targets)
+
+    def apply_diff(self, diff):
+        """
+        Return a new LinkGraph with a diff applied. `diff` is a dictionary
+        with any of the keys "add_pages" and "remove_pages", holding page
+        names, and "add_links" and "remove_links", holding (page, page)
+        pairs. Removing a page removes its links; links involving pages
+        not in the new graph, and links from a page to itself, are ignored.
+        """
+        removed = set(diff.get("remove_pages", ()))
+        added = [
+            page for page in dict.fromkeys(diff.get("add_pages", ()))
+            if page not in self.index and page not in removed
+        ]
+        removed_indices = [
+            self.index[page] for page in removed if page in self.index
+        ]
+
+        # Old page indices mapped to new ones, -1 for removed pages. Kept
+        # pages stay in order, so the remapped links stay sorted
+        kept = np.ones(len(self.pages), dtype=bool)
+        kept[removed_indices] = False
+        remap = np.cumsum(kept) - 1
+        remap[~kept] = -1
+        if removed_indices:
+            pages = [page for page in self.pages if page not in removed]
+            index = {page: i for i, page in enumerate(pages)}
+        else:
+            pages = list(self.pages)
+            index = dict(self.index)
+        for page in added:
+            index[page] = len(pages)
+            pages.append(page)
+
+        sources = remap[self.sources]
+        targets = remap[self.targets]
+        keep = (sources >= 0) & (targets >= 0)
+        sources, targets = sources[keep], targets[keep]
+
+        # Links as keys in the order they are stored, sorted by target and
+        # then source, so links are found and inserted by binary search
+        n = len(pages)
+        keys = targets * n + sources
+        positions, found = find_keys(
+            keys, link_keys(diff.get("remove_links", ()), index)
+        )
+        keys = np.delete(keys, positions[found])
+        added_links = np.unique(link_keys(diff.get("add_links", ()), index))
+        positions, found = find_keys(keys, added_links)
+        keys = np.insert(keys, positions[~found], added_links[~found])
+        return LinkGraph(pages, keys % n, keys // n)
+
+    def to_corpus(self):
+        """
+        Return the graph as a corpus dictionary, as returned by `crawl`.
+        """
+        return {
+            page: {
+                self.pages[j]
+                for j in self.out_links[self.out_indptr[i]:self.out_indptr[i + 1]]
+            }
+            for i, page in enumerate(self.pages)
+        }
+
+    def __len__(self):
+        return len(self.pages)
+
+    def propagate(self, weights):
+        """
+        Return, for every page, the sum of `weights` over the pages
+        linking to it. `weights` may also be a matrix with a row per page,
+        in which case every column is summed at once.
+        """
+        n = len(self.pages)
+        if weights.ndim == 1:
+            return np.bincount(self.targets, weights=weights[self.sources], minlength=n)
+
+        # NumPy has no fast way to sum many columns over sparse links, so
+        # the incoming links are wrapped as a SciPy matrix the first time
+        if self.incoming is None:
+            self.incoming = scipy.sparse.csr_matrix(
+                (np.ones(len(self.sources)), self.sources, self.indptr),
+                shape=(n, n)
+            )
+        return self.incoming @ weights
+
+    def spread(self, pages, weights):
+        """
+        Return, for every page, the sum over the `pages` linking to it of
+        their `weights`, each divided evenly among the page's links. Only
+        the links of `pages` are visited, which must not be dangling.
+        """
+        counts = self.out_degree[pages]
+        ends = np.cumsum(counts)
+        positions = np.arange(ends[-1] if len(ends) else 0) + np.repeat(
+            self.out_indptr[pages] - (ends - counts), counts
+        )
+        return np.bincount(
+            self.out_links[positions],
+            weights=np.repeat(weights / counts, counts),
+            minlength=len(self.pages)
+        )
+
+    def step(self, ranks, damping_factor):
+        """
+        Apply one step of the PageRank random surfer to `ranks`.
+        """
+        n = len(self.pages)
+        share = np.divide(
+            ranks, self.out_degree, out=np.zeros(n), where=~self.dangling
+        )
+        dangling_mass = ranks[self.dangling].sum()
+        return (
+            (1 - damping_factor) / n
+            + damping_factor * (self.propagate(share) + dangling_mass / n)
+        )
+
+    def teleport(self, seeds):
+        """
+        Return a matrix with a column per teleport distribution in `seeds`,
+        each either a collection of pages, teleported to uniformly, or a
+        dictionary from page to weight. Pages not in the graph are ignored
+        and each column is normalized to sum to 1.
+        """
+        matrix = np.zeros((len(self.pages), len(seeds)))
+        for column, seed in enumerate(seeds):
+            weights = seed if isinstance(seed, dict) else dict.fromkeys(seed, 1)
+            for page, weight in weights.items():
+                if page in self.index:
+                    matrix[self.index[page], column] += weight
+            total = matrix[:, column].sum()
+            if total <= 0:
+                raise ValueError(f"teleport distribution {column} has no pages")
+            matrix[:, column] /= total
+        return matrix
+
+    def ranks_dict(self, ranks):
+        """
+        Return a rank vector as a dictionary from page to rank.
+        """
+        return {page: float(rank) for page, rank in zip(self.pages, ranks)}
+
+
+def link_keys(links, index):
+    """
+    Return (source, target) page-name pairs as an array of
+    `target * len(index) + source` keys, skipping pairs with a page
+    missing from `index` and links from a page to itself.
+    """
+    n = len(index)
+    return np.array([
+        index[target] * n + index[source] for source, target in links
+        if source in index and target in index and source != target
+    ], dtype=np.int64)
+
+
+def find_keys(keys, wanted):
+    """
+    Return the positions of `wanted` keys in the sorted array `keys`, or
+    where they would be inserted, and whether each is already there.
+    """
+    positions = np.searchsorted(keys, wanted)
+    found = np.zeros(len(wanted), dtype=bool)
+    inside = positions < len(keys)
+    found[inside] = keys[positions[inside]] == wanted[inside]
+    return positions, found
@@ -1,42 +1,145 @@
 import os
+import pickle
 import random
 import re
 import sys
+import tempfile
+
+import numpy as np
+
+from crawler import crawl_edge_list, crawl_graph
+from linkgraph import LinkGraph
+from sampling import (
+    PARALLEL_WALKERS, walk, walk_adaptive, walk_batched, walk_parallel
+)
+from solvers import (
+    MAX_ITERATIONS, SOLVERS, TOLERANCE, jacobi, personalized,
+    power_iteration, push_residuals
+)
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Default widest confidence interval, and most seconds spent sampling,
+# for sample_pagerank_adaptive
+WIDTH = 0.002
+BUDGET = 10.0
+
+# Name of the per-corpus cache of extracted links, and its format version
+LINK_CACHE = ".links.pickle"
+LINK_CACHE_VERSION = 1
+
+# Name of the per-corpus directory holding an on-disk edge list
+EDGE_LIST = ".edges"
+
+# Optional command-line flags accepted by main
+FLAGS = [
+    "--sparse", "--fast", "--batched", "--parallel", "--concurrent",
+    "--out-of-core", "--confidence"
+]
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    solver = None
+    for flag in flags:
+        if flag.startswith("--solver="):
+            solver = flag[len("--solver="):]
+    other_flags = [flag for flag in flags if not flag.startswith("--solver=")]
+    if (len(args) != 1 or solver not in (None, *SOLVERS)
+            or any(flag not in FLAGS for flag in other_flags)):
+        sys.exit(
+            f"Usage: python pagerank.py corpus [{'] ['.join(FLAGS)}] "
+            f"[--solver={'|'.join(SOLVERS)}]"
+        )
+    if "--out-of-core" in flags:
+        # The corpus is never held in memory, so only iteration is possible
+        ranks = iterate_pagerank_out_of_core(args[0], DAMPING)
+        print("PageRank Results from Out-of-Core Iteration")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+        return
+    if "--concurrent" in flags:
+        graph = crawl_graph(args[0])
+        corpus = graph.to_corpus()
+    else:
+        corpus = crawl(args[0])
+        graph = LinkGraph.from_corpus(corpus)
+    throughput = []
+    if "--confidence" in flags:
+        ranks, intervals, samples = sample_pagerank_adaptive(graph, DAMPING)
+        print(f"PageRank Results from Adaptive Sampling (n = {samples})")
+        for page in sorted(ranks):
+            low, high = intervals[page]
+            print(f"  {page}: {ranks[page]:.4f} (95% CI {low:.4f} to {high:.4f})")
+    else:
+        if "--parallel" in flags:
+            ranks = sample_pagerank_parallel(
+                graph, DAMPING, SAMPLES, throughput=throughput
+            )
+        elif "--batched" in flags:
+            ranks = sample_pagerank_batched(graph, DAMPING, SAMPLES)
+        elif "--fast" in flags:
+            ranks = sample_pagerank_fast(graph, DAMPING, SAMPLES)
+        else:
+            ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+        print(f"PageRank Results from Sampling (n = {SAMPLES})")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+    for report in throughput:
+        print(
+            f"  Walker {report['walker']} (pid {report['pid']}): "
+            f"{report['samples']} samples in {report['seconds']:.3f}s"
+        )
+    residuals = []
+    if solver is not None:
+        ranks = solve_pagerank(graph, DAMPING, solver, residuals=residuals)
+    elif "--sparse" in flags:
+        ranks = iterate_pagerank_sparse(graph, DAMPING)
+    else:
+        ranks = iterate_pagerank(corpus, DAMPING)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    if residuals:
+        print(
+            f"  {solver}: {len(residuals)} iterations, "
+            f"final L1 residual {residuals[-1]:.2e}"
+        )
 
 
-def crawl(directory):
+def crawl(directory, cache=True):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    If `cache` is true, the links extracted from each file are cached in
+    the directory, keyed by the file's modification time and size, and
+    only new or changed files are parsed again.
     """
     pages = dict()
+    cached = read_link_cache(directory) if cache else {}
+    entries = {}
 
     # Extract all links from HTML files
     for filename in os.listdir(directory):
         if not filename.endswith(".html"):
             continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+        stat = os.stat(os.path.join(directory, filename))
+        key = (stat.st_mtime_ns, stat.st_size)
+        if filename in cached and cached[filename][0] == key:
+            pages[filename] = cached[filename][1]
+        else:
+            with open(os.path.join(directory, filename)) as f:
+                contents = f.read()
+                links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
+                pages[filename] = set(links) - {filename}
+        entries[filename] = (key, pages[filename])
+
+    if cache and entries != cached:
+        write_link_cache(directory, entries)
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -48,6 +151,42 @@ def crawl(directory):
     return pages
 
 
+def read_link_cache(directory):
+    """
+    Return the cached links of `directory` as a dictionary from filename
+    to ((mtime, size), links), or an empty dictionary if there is no
+    usable cache.
+    """
+    try:
+        with open(os.path.join(directory, LINK_CACHE), "rb") as f:
+            version, entries = pickle.load(f)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return {}
+    return entries if version == LINK_CACHE_VERSION else {}
+
+
+def write_link_cache(directory, entries):
+    """
+    Save extracted links to the cache of `directory`. The cache is written
+    to a temporary file of its own first, so readers never see a partial
+    cache, and crawls saving the same cache at once cannot interleave.
+    """
+    try:
+        fd, temporary = tempfile.mkstemp(
+            prefix=f"{LINK_CACHE}.", suffix=".tmp", dir=directory
+        )
+    except OSError:
+        # The corpus may be read-only; the cache only saves time
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((LINK_CACHE_VERSION, entries), f, pickle.HIGHEST_PROTOCOL)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, os.path.join(directory, LINK_CACHE))
+    except OSError:
+        os.remove(temporary)
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -101,6 +240,65 @@ def sample_pagerank(corpus, damping_factor, n):
     return pagerank
     raise NotImplementedError
 
+
+def sample_pagerank_fast(corpus, damping_factor, n):
+    """
+    Return the same estimate as `sample_pagerank`, but precompute each
+    page's outgoing links once so that every sample costs O(1) instead of
+    rebuilding the whole transition model.
+    """
+    graph = link_graph(corpus)
+    return graph.ranks_dict(walk(graph, damping_factor, n) / n)
+
+
+def sample_pagerank_batched(corpus, damping_factor, n):
+    """
+    Return a PageRank estimate from `n` samples like `sample_pagerank`,
+    but split them over many random surfers advanced together in
+    vectorized NumPy steps.
+    """
+    graph = link_graph(corpus)
+    return graph.ranks_dict(walk_batched(graph, damping_factor, n) / n)
+
+
+def sample_pagerank_parallel(corpus, damping_factor, n,
+                             walkers=PARALLEL_WALKERS, seed=None,
+                             throughput=None):
+    """
+    Return a PageRank estimate from `n` samples like `sample_pagerank`,
+    but split them over independent random surfers running in a process
+    pool, and merge their visit counts.
+
+    The result is reproducible for a given `seed`. If `throughput` is a
+    list, a report of each walker's samples and timing is appended to it.
+    """
+    graph = link_graph(corpus)
+    counts, reports = walk_parallel(
+        graph, damping_factor, n, walkers=walkers, seed=seed
+    )
+    if throughput is not None:
+        throughput.extend(reports)
+    return graph.ranks_dict(counts / n)
+
+
+def sample_pagerank_adaptive(corpus, damping_factor, width=WIDTH, budget=BUDGET):
+    """
+    Return PageRank estimates by sampling like `sample_pagerank_batched`,
+    but keep sampling only until every page's 95% confidence interval is
+    at most `width` wide, or `budget` seconds have passed.
+
+    Return the estimates, a dictionary from page to the (low, high) bounds
+    of its confidence interval, and the number of samples drawn.
+    """
+    graph = link_graph(corpus)
+    ranks, half_width, samples = walk_adaptive(graph, damping_factor, width, budget)
+    intervals = {
+        page: (max(float(rank - half), 0.0), float(rank + half))
+        for page, rank, half in zip(graph.pages, ranks, half_width)
+    }
+    return graph.ranks_dict(ranks), intervals, samples
+
+
 def iterate_pagerank(corpus, damping_factor):
     """
     Return PageRank values for each page by iteratively updating
@@ -152,7 +350,121 @@ def iterate_pagerank(corpus, damping_factor):
     return prob
     raise NotImplementedError
 
-    
+
+def iterate_pagerank_sparse(corpus, damping_factor):
+    """
+    Return the same PageRank values as `iterate_pagerank`, but build the
+    link structure once as sparse arrays of incoming links and run each
+    iteration as a vectorized matrix-vector product, so an iteration costs
+    O(pages + links) instead of O(pages^2).
+    """
+    graph = link_graph(corpus)
+    return graph.ranks_dict(power_iteration(graph, damping_factor))
+
+
+def iterate_pagerank_out_of_core(directory, damping_factor, path=None):
+    """
+    Return the same PageRank values as `iterate_pagerank_sparse` for a
+    directory of HTML pages, without holding its links in memory.
+
+    The links are written to `path`, by default the EDGE_LIST directory
+    inside the corpus, as an edge list sorted by target. Each iteration
+    then streams over the memory-mapped file block by block, so memory
+    use grows with the number of pages but not with the number of links.
+    """
+    if path is None:
+        path = os.path.join(directory, EDGE_LIST)
+    graph = crawl_edge_list(directory, path)
+    return graph.ranks_dict(power_iteration(graph, damping_factor))
+
+
+def solve_pagerank(corpus, damping_factor, solver="gauss-seidel",
+                   tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                   residuals=None):
+    """
+    Return PageRank values for each page using one of the solvers in
+    `solvers.SOLVERS`, chosen by name, iterating until the L1 norm of the
+    residual is at most `tolerance` or `max_iterations` is reached.
+
+    If `residuals` is a list, the L1 residual after every iteration is
+    appended to it, to compare how quickly the solvers converge.
+    """
+    graph = link_graph(corpus)
+    ranks = SOLVERS[solver](
+        graph, damping_factor, tolerance=tolerance,
+        max_iterations=max_iterations, residuals=residuals
+    )
+    return graph.ranks_dict(ranks)
+
+
+def personalized_pagerank(corpus, damping_factor, seeds,
+                          tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Return personalized PageRank values for many teleport distributions
+    at once, as a list with a dictionary of PageRank values for each.
+
+    Each of `seeds` is a collection of pages, which the random surfer
+    jumps to uniformly instead of to any page in the corpus, or a
+    dictionary from page to teleport weight. All distributions are solved
+    together as one matrix of rank vectors.
+    """
+    graph = link_graph(corpus)
+    ranks = personalized(
+        graph, damping_factor, graph.teleport(seeds),
+        tolerance=tolerance, max_iterations=max_iterations
+    )
+    return [graph.ranks_dict(column) for column in ranks.T]
+
+
+def update_pagerank(corpus, ranks, diff, damping_factor, push=False,
+                    tolerance=TOLERANCE, residuals=None):
+    """
+    Update PageRank values after a change to the corpus, without starting
+    over from uniform ranks.
+
+    `corpus` is the corpus (or LinkGraph) that `ranks` was computed for,
+    and `diff` describes the change, as for `LinkGraph.apply_diff`.
+    Iteration is warm-started from the previous ranks, with new pages
+    starting at the smallest possible rank, until the L1 norm of an
+    iteration's change is at most `tolerance`. If `push` is true,
+    residuals are pushed instead, with `push_residuals`, which visits only
+    the links of pages whose residual is still large but stops at a
+    stricter tolerance, so it usually takes longer than iterating.
+
+    If `residuals` is a list, the L1 residual of every iteration, or of
+    every pass of pushes, is appended to it, so its length is the number
+    of iterations the update took.
+
+    Return the changed LinkGraph and its PageRank values, which can be
+    passed to the next update.
+    """
+    graph = link_graph(corpus).apply_diff(diff)
+    n = len(graph)
+    start = np.array([ranks.get(page, (1 - damping_factor) / n) for page in graph.pages])
+    start /= start.sum()
+    if push:
+        new_ranks = push_residuals(
+            graph, damping_factor, start, tolerance=tolerance,
+            residuals=residuals
+        )
+    else:
+        new_ranks = jacobi(
+            graph, damping_factor, tolerance=tolerance, start=start,
+            residuals=residuals
+        )
+    return graph, graph.ranks_dict(new_ranks)
+
+
+def link_graph(corpus):
+    """
+    Return a LinkGraph for a corpus dictionary. The faster engines
+    also accept a LinkGraph in place of a corpus, such as one
+    returned by `crawl_graph`, which is returned unchanged.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,254 @@
+import multiprocessing
+import os
+import random
+import time
+
+import numpy as np
+
+# Fewest steps each walker takes in a batched run, which keeps the bias
+# from starting every walker at a uniformly random page below sampling noise
+MIN_WALK = 1000
+
+# Default number of walkers advanced together in a batched run
+WALKERS = 1024
+
+# Default number of independent walkers in walk_parallel, fixed so that
+# results don't depend on how many cores the machine has
+PARALLEL_WALKERS = 16
+
+# Fewest visits buffered before they are counted, so that each
+# np.bincount over every page is shared by many steps
+VISIT_BUFFER = 1 << 20
+
+# Steps each walker takes per batch in walk_adaptive, long enough for
+# successive batches to be nearly independent
+BATCH_STEPS = 100
+
+# Fewest batches walk_adaptive draws before trusting its standard errors
+MIN_BATCHES = 30
+
+# Steps each walker takes before walk_adaptive starts counting visits, so
+# the uniformly random starting pages no longer bias the estimate
+BURN_IN = 100
+
+# Standard errors per half-width of a 95% confidence interval
+Z = 1.96
+
+
+def walk(graph, damping_factor, n, rng=random):
+    """
+    Return visit counts per page from a single random surfer on a
+    LinkGraph that visits `n` pages, starting with a page at random.
+
+    Each step costs O(1): a coin flip decides between following a link,
+    picked uniformly by position in the page's outgoing links, and jumping
+    to a random page. Pages without links always jump, just as their
+    transition model is uniform over all pages.
+    """
+    pages = len(graph)
+    indptr = graph.out_indptr.tolist()
+    links = graph.out_links.tolist()
+    counts = [0] * pages
+
+    current = rng.randrange(pages)
+    counts[current] += 1
+    for _ in range(1, n):
+        start = indptr[current]
+        degree = indptr[current + 1] - start
+        if degree == 0 or rng.random() >= damping_factor:
+            current = rng.randrange(pages)
+        else:
+            current = links[start + rng.randrange(degree)]
+        counts[current] += 1
+    return np.array(counts)
+
+
+def walk_batched(graph, damping_factor, n, walkers=WALKERS, rng=None):
+    """
+    Return visit counts per page from independent random surfers on a
+    LinkGraph that visit `n` pages in total, advancing all walkers at once
+    with vectorized NumPy steps. `rng` is a numpy.random.Generator.
+
+    Each walker behaves exactly like the single surfer in `walk`; the number
+    of walkers is reduced when needed so each takes at least MIN_WALK steps.
+    Visits are buffered and counted together once there are at least as
+    many as pages, so counting costs O(1) per visit.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    pages = len(graph)
+    walkers = max(1, min(walkers, n // MIN_WALK))
+    counts = np.zeros(pages, dtype=np.int64)
+    rounds = -(-max(VISIT_BUFFER, pages) // walkers)
+    visits = np.empty(min(n, rounds * walkers), dtype=np.int64)
+    filled = 0
+
+    current = rng.integers(pages, size=walkers)
+    remaining = n
+    while remaining > 0:
+        # The last round may need fewer visits than there are walkers
+        if remaining < walkers:
+            current = current[:remaining]
+        visits[filled:filled + len(current)] = current
+        filled += len(current)
+        remaining -= len(current)
+        if filled == len(visits) or remaining == 0:
+            counts += np.bincount(visits[:filled], minlength=pages)
+            filled = 0
+        if remaining == 0:
+            break
+        current = advance(graph, damping_factor, current, rng)
+    return counts
+
+
+def advance(graph, damping_factor, current, rng):
+    """
+    Return the pages that walkers at `current` visit next, taking one
+    step of the random surfer for all of them at once.
+    """
+    pages = len(graph)
+    degree = graph.out_degree[current]
+    jump = (degree == 0) | (rng.random(len(current)) >= damping_factor)
+    follow = np.flatnonzero(~jump)
+    offset = (rng.random(len(follow)) * degree[follow]).astype(np.int64)
+
+    current = current.copy()
+    current[jump] = rng.integers(pages, size=int(jump.sum()))
+    current[follow] = graph.out_links[graph.out_indptr[current[follow]] + offset]
+    return current
+
+
+def walk_adaptive(graph, damping_factor, width, budget, walkers=WALKERS,
+                  rng=None):
+    """
+    Return PageRank estimates for a LinkGraph from batched random surfers
+    that stop as soon as the estimates are precise enough, together with
+    the half-width of each page's 95% confidence interval and the number
+    of samples drawn.
+
+    Visits are counted in batches of BATCH_STEPS steps per walker, and
+    the spread of the batch frequencies gives each page's standard error
+    (the method of batch means). Sampling stops once every interval is at
+    most `width` wide, or after `budget` seconds.
+
+    At most `walkers` walkers are used, but fewer when the first
+    MIN_BATCHES batches would already draw more samples than the widest
+    interval needs, as estimated from the largest rank after one PageRank
+    step. Between checks, sampling continues for as many batches as the
+    widest interval suggests are still needed, but never more than
+    doubles, so each check's cost over every page is shared by many
+    batches.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    start = time.perf_counter()
+    pages = len(graph)
+
+    # A page of rank p needs about (2 Z / width) ** 2 * p samples, and
+    # pages never visited need 6 / width for the rule of three
+    largest = graph.step(np.full(pages, 1 / pages), damping_factor).max()
+    needed = max(6 / width, (2 * Z / width) ** 2 * largest)
+    walkers = int(min(
+        walkers, max(1, np.ceil(needed / (MIN_BATCHES * BATCH_STEPS)))
+    ))
+
+    current = rng.integers(pages, size=walkers)
+    for _ in range(BURN_IN):
+        current = advance(graph, damping_factor, current, rng)
+
+    # Running sums of the batch frequencies and of their squares
+    total = np.zeros(pages)
+    squares = np.zeros(pages)
+    visits = np.empty((BATCH_STEPS, walkers), dtype=np.int64)
+    batches = 0
+    check = MIN_BATCHES
+    while True:
+        for step in range(BATCH_STEPS):
+            visits[step] = current
+            current = advance(graph, damping_factor, current, rng)
+
+        # Only pages visited in the batch have a frequency to add
+        visited, counts = np.unique(visits, return_counts=True)
+        frequencies = counts / visits.size
+        total[visited] += frequencies
+        squares[visited] += frequencies ** 2
+        batches += 1
+
+        out_of_time = time.perf_counter() - start >= budget
+        if batches < check and not out_of_time:
+            continue
+        ranks = total / batches
+        variance = np.maximum(squares / batches - ranks ** 2, 0)
+        variance *= batches / max(batches - 1, 1)
+        samples = batches * visits.size
+
+        # Pages never visited have no spread at all, so intervals are
+        # never narrower than the rule of three allows for them
+        half_width = np.maximum(Z * np.sqrt(variance / batches), 3 / samples)
+        widest = 2 * half_width.max()
+        if widest <= width or out_of_time:
+            return ranks, half_width, samples
+
+        # Intervals narrow with the square root of the number of batches
+        more = int(np.ceil(batches * ((widest / width) ** 2 - 1)))
+        check = batches + max(1, min(more, batches))
+
+
+# LinkGraph shared with each pool worker by init_worker
+worker_graph = None
+
+
+def walk_parallel(graph, damping_factor, n, walkers=PARALLEL_WALKERS,
+                  seed=None, processes=None):
+    """
+    Return visit counts per page from `walkers` independent random surfers
+    on a LinkGraph, run in a process pool, that visit `n` pages in total,
+    together with a report of each walker's throughput.
+
+    Each walker gets its own seed spawned from the master `seed`, so the
+    merged counts depend only on `seed` and `walkers`, not on `processes`,
+    which defaults to one per core.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(walkers)
+    tasks = [
+        (walker, n // walkers + (walker < n % walkers),
+         int(seeds[walker].generate_state(1)[0]), damping_factor)
+        for walker in range(walkers)
+    ]
+
+    with multiprocessing.Pool(
+        processes, initializer=init_worker, initargs=(graph,)
+    ) as pool:
+        results = pool.map(run_walker, tasks)
+
+    counts = np.zeros(len(graph), dtype=np.int64)
+    reports = []
+    for walker_counts, report in results:
+        counts += walker_counts
+        reports.append(report)
+    return counts, reports
+
+
+def init_worker(graph):
+    global worker_graph
+    worker_graph = graph
+
+
+def run_walker(task):
+    """
+    Run one walker in a pool worker, returning its visit counts and
+    a report of its throughput.
+    """
+    walker, samples, seed, damping_factor = task
+    start = time.perf_counter()
+    counts = np.zeros(len(worker_graph), dtype=np.int64)
+    if samples > 0:
+        counts = walk(worker_graph, damping_factor, samples, random.Random(seed))
+    seconds = time.perf_counter() - start
+    return counts, {
+        "walker": walker,
+        "pid": os.getpid(),
+        "samples": samples,
+        "seconds": seconds,
+        "samples_per_second": samples / seconds if seconds else None
+    }